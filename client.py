@@ -1,60 +1,191 @@
 #!/usr/bin/env python3
+import errno
 import socket
 import sys
 import os
 import subprocess
 import json
 import platform
+import selectors
 import threading
 import time
-import queue
+import collections
 import signal
-import base64
+import shlex
+import struct
+import binascii
 
 # Platform-specific imports
 if platform.system() == 'Windows':
+    import ctypes
     import msvcrt
 else:
-    import select
     try:
         import pty
         PTY_AVAILABLE = True
     except ImportError:
         PTY_AVAILABLE = False
 
+# Binary frame kinds (first byte on the wire; JSON lines start with '{')
+FRAME_SHELL_OUTPUT = b'\x01'
+
+# Coalesce queued shell output into frames of up to this many bytes
+SEND_BATCH_SIZE = 32768
+
+# base64.b64encode is a pure-Python wrapper that calls this then strips
+# the trailing newline; going straight to binascii skips the wrapper
+_b2a = binascii.b2a_base64
+
+# orjson is a C extension that returns bytes directly, several times
+# faster on small dicts; entirely optional, stdlib json otherwise
+try:
+    import orjson
+
+    def _dumps(obj):
+        return orjson.dumps(obj) + b'\n'
+
+    _loads = orjson.loads
+except ImportError:
+    def _dumps(obj):
+        return (json.dumps(obj) + '\n').encode('utf-8')
+
+    _loads = json.loads
+
+
 class SimpleTerminalClient:
+    # Per-read size for shell output; 64KiB (the Linux default pipe buffer)
+    # amortizes the per-syscall cost 64x vs the old 1KiB reads on bulk dumps
+    READ_CHUNK = 65536
+
     def __init__(self, server_ip, server_port):
         self.server_ip = server_ip
         self.server_port = server_port
         self.socket = None
+        self._sendall = None
+        # Serializes socket writes: sendall releases the GIL between its
+        # internal send(2) calls, so concurrent writers (event loop,
+        # run_command workers, the Windows fallback threads) could splice
+        # frames into each other mid-payload without it
+        self._send_lock = threading.Lock()
         self.running = False
         self.shell_process = None
+        self._shell_pid = None
+        self.master_fd = None
         self.is_windows = platform.system() == 'Windows'
-        self.output_queue = queue.Queue()
-        self.input_queue = queue.Queue()
+        # Used only by the threaded Windows fallback; on Unix a single
+        # selector-based event loop moves bytes directly. Each pair is
+        # single-producer/single-consumer: deque.append/popleft are
+        # atomic, so no lock per item like queue.Queue, and the Event
+        # only signals "something is there"
+        self.output_deque = collections.deque()
+        self.output_event = threading.Event()
+        self.input_deque = collections.deque()
+        self.input_event = threading.Event()
+        self._rx_buffer = bytearray()
+        # Scratch buffer for recv_into so socket reads don't allocate a
+        # fresh bytes object per packet
+        self._rx_view = memoryview(bytearray(self.READ_CHUNK))
+        # DefaultSelector resolves to epoll on Linux (kqueue on BSD/macOS):
+        # fds are registered once instead of select()'s per-call fdset copy
+        self._sel = selectors.DefaultSelector() if not self.is_windows else None
+
+        # Shutdown wakeup fd: a signal handler writes here so a blocked
+        # selector wakes immediately instead of unwinding via sys.exit
+        # from signal context. eventfd where the platform has it (Linux),
+        # otherwise a classic self-pipe.
+        self._shutdown_rfd = self._shutdown_wfd = None
+        if not self.is_windows:
+            if hasattr(os, 'eventfd'):
+                fd = os.eventfd(0, os.EFD_NONBLOCK)
+                self._shutdown_rfd = self._shutdown_wfd = fd
+            else:
+                rfd, wfd = os.pipe()
+                os.set_blocking(rfd, False)
+                os.set_blocking(wfd, False)
+                self._shutdown_rfd, self._shutdown_wfd = rfd, wfd
+        # Legacy base64+JSON framing for shell output (for old servers)
+        self.use_json_output = os.environ.get('REMOTEEXEC_JSON_OUTPUT') == '1'
+        # Snapshot the environment once for one-shot commands so Popen
+        # doesn't copy the env dict per invocation
+        self._spawn_env = os.environ.copy()
+
+        # The platform.* calls behind client_info can fork uname on Unix;
+        # compute and encode the message once so reconnects don't re-pay it
+        self._client_info_bytes = _dumps(self.get_client_info())
+        self._pong_prefix = b'{"type": "pong", "timestamp": '
         
         # Signal handlers
         signal.signal(signal.SIGINT, self.signal_handler)
         if not self.is_windows:
             signal.signal(signal.SIGTERM, self.signal_handler)
+            # SIGCHLD nudges the event loop awake so _shell_exited is
+            # re-checked immediately instead of at the next 1s timeout
+            signal.signal(signal.SIGCHLD, self._sigchld_handler)
     
     def signal_handler(self, signum, frame):
         print("\n🛑 Received shutdown signal...")
-        self.cleanup()
-        sys.exit(0)
+        self.request_shutdown()
+
+    def request_shutdown(self):
+        """Ask the main loop to exit; safe to call from a signal handler"""
+        self.running = False
+        # Terminating the shell also unblocks a main thread parked in
+        # shell_process.wait() on the Windows path
+        if self.shell_process is not None:
+            try:
+                self.shell_process.terminate()
+            except Exception:
+                pass
+        self._wake_main_loop()
+
+    def _sigchld_handler(self, signum, frame):
+        self._wake_main_loop()
+
+    def _wake_main_loop(self):
+        """Poke the wakeup fd so a blocked selector returns immediately"""
+        if self._shutdown_wfd is None:
+            return
+        try:
+            if self._shutdown_wfd == self._shutdown_rfd:
+                os.eventfd_write(self._shutdown_wfd, 1)
+            else:
+                os.write(self._shutdown_wfd, b'\x01')
+        except OSError:
+            pass
+
+    def _handle_shutdown_readable(self):
+        """Drain the wakeup fd; the loop then re-checks running/shell state"""
+        try:
+            os.read(self._shutdown_rfd, 8)
+        except OSError:
+            pass
     
     def send_message(self, message):
         """Send JSON message to server"""
         try:
             if isinstance(message, dict):
-                message = json.dumps(message)
-            message_data = (message + '\n').encode('utf-8')
-            self.socket.send(message_data)
+                payload = _dumps(message)
+            else:
+                payload = message.encode('utf-8') + b'\n'
+            # sendall loops until every byte is written; a bare send() can
+            # short-write under backpressure and silently drop the rest
+            with self._send_lock:
+                self._sendall(payload)
             return True
         except Exception as e:
             print(f"Send error: {e}")
             return False
-    
+
+    def _send_binary_frame(self, kind_byte, payload):
+        """Send a length-prefixed binary frame (kind + 4-byte BE length + payload)"""
+        try:
+            with self._send_lock:
+                self._sendall(kind_byte + struct.pack('>I', len(payload)) + payload)
+            return True
+        except Exception as e:
+            print(f"Send error: {e}")
+            return False
+
     def get_client_info(self):
         """Get client system information"""
         try:
@@ -103,22 +234,24 @@ class SimpleTerminalClient:
                 
                 # Try to use PTY if available
                 if PTY_AVAILABLE:
-                    import pty
-                    master_fd, slave_fd = pty.openpty()
-                    
-                    self.shell_process = subprocess.Popen(
-                        shell,
-                        stdin=slave_fd,
-                        stdout=slave_fd,
-                        stderr=slave_fd,
-                        shell=False,
-                        bufsize=0,
-                        universal_newlines=False,
-                        preexec_fn=os.setsid
-                    )
-                    
-                    os.close(slave_fd)
+                    # forkpty returns (pid, master_fd) in one shot: the
+                    # child already has a new session and the PTY slave as
+                    # its controlling terminal, so the subprocess module's
+                    # fork/exec pipe machinery and slave fd juggling are
+                    # skipped entirely
+                    pid, master_fd = os.forkpty()
+                    if pid == 0:
+                        # Child: become the shell
+                        try:
+                            os.execvp(shell, [shell])
+                        finally:
+                            os._exit(127)
+
+                    # Non-blocking so the event loop can drain everything
+                    # available per wakeup without risking a stall
+                    os.set_blocking(master_fd, False)
                     self.master_fd = master_fd
+                    self._shell_pid = pid
                 else:
                     # Fallback without PTY
                     self.shell_process = subprocess.Popen(
@@ -130,6 +263,18 @@ class SimpleTerminalClient:
                         bufsize=0,
                         universal_newlines=False
                     )
+
+                    # Enlarge the kernel pipe buffer where permitted so
+                    # bulk output needs fewer reads (Linux only; no-op
+                    # elsewhere and on PTYs, which are not pipes)
+                    try:
+                        import fcntl
+                        fcntl.fcntl(self.shell_process.stdout.fileno(),
+                                    fcntl.F_SETPIPE_SZ, 1 << 20)
+                    except (ImportError, AttributeError, OSError):
+                        pass
+
+                    os.set_blocking(self.shell_process.stdout.fileno(), False)
             
             return True
             
@@ -137,159 +282,427 @@ class SimpleTerminalClient:
             print(f"❌ Shell creation failed: {e}")
             return False
     
+    def _shell_exited(self):
+        """Check whether the shell process has terminated"""
+        if self._shell_pid is not None:
+            try:
+                pid, _ = os.waitpid(self._shell_pid, os.WNOHANG)
+            except ChildProcessError:
+                return True
+            if pid:
+                self._shell_pid = None
+                return True
+            return False
+        return self.shell_process is not None and self.shell_process.poll() is not None
+
+    def _shell_fd(self):
+        """File descriptor carrying shell output (PTY master or stdout pipe)"""
+        if self.master_fd is not None:
+            return self.master_fd
+        return self.shell_process.stdout.fileno()
+
+    def _write_all_to_fd(self, fd, data):
+        """Write all of data to a non-blocking fd, waiting while it's full.
+
+        os.write on a non-blocking PTY master can accept only part of a
+        large payload (or none, raising BlockingIOError); loop on the
+        remainder, parking on writability until every byte is flushed.
+        """
+        view = memoryview(data)
+        while view and self.running:
+            try:
+                n = os.write(fd, view)
+            except BlockingIOError:
+                wsel = selectors.DefaultSelector()
+                wsel.register(fd, selectors.EVENT_WRITE)
+                wsel.select(timeout=1.0)
+                wsel.close()
+                continue
+            view = view[n:]
+
+    def _write_to_shell(self, command):
+        """Write a command line to the shell process"""
+        try:
+            if self.master_fd is not None:
+                self._write_all_to_fd(self.master_fd, command.encode('utf-8', errors='replace') + b'\n')
+            elif self.shell_process and self.shell_process.poll() is None:
+                self.shell_process.stdin.write(command.encode('utf-8', errors='replace') + b'\n')
+                self.shell_process.stdin.flush()
+        except Exception as e:
+            print(f"Write error: {e}")
+
+    def _send_shell_output(self, data):
+        """Frame a chunk of shell output and send it to the server"""
+        if self.use_json_output:
+            # Legacy framing: base64 inflates bytes by ~4/3 plus
+            # JSON overhead, so only used when explicitly requested
+            message = {
+                "type": "shell_output",
+                "data": _b2a(data, newline=False).decode('ascii')
+            }
+            self.send_message(message)
+        else:
+            self._send_binary_frame(FRAME_SHELL_OUTPUT, data)
+
+    def _handle_shell_readable(self):
+        """Drain all available shell output and forward it as one frame"""
+        fd = self._shell_fd()
+        chunks = []
+        while True:
+            try:
+                chunk = os.read(fd, self.READ_CHUNK)
+            except BlockingIOError:
+                break
+            except OSError:
+                chunk = b''
+            if not chunk:
+                # Shell closed its end of the PTY/pipe
+                print("⚠️  Shell process terminated")
+                self.running = False
+                break
+            chunks.append(chunk)
+
+        if chunks:
+            self._send_shell_output(b''.join(chunks))
+
+    def _handle_socket_readable(self):
+        """Read server data and dispatch any complete JSON messages"""
+        try:
+            n = self.socket.recv_into(self._rx_view)
+        except socket.timeout:
+            return
+        except Exception as e:
+            if self.running:
+                print(f"Server message error: {e}")
+            self.request_shutdown()
+            return
+
+        if not n:
+            print("📡 Server disconnected")
+            self.request_shutdown()
+            return
+
+        self._feed_server_bytes(self._rx_view[:n])
+
+    def _feed_server_bytes(self, data):
+        """Buffer received bytes and dispatch any complete JSON messages.
+
+        The buffer stays bytes: extracting a line with find/del avoids
+        re-decoding and re-copying the whole unfinished tail on every
+        recv the way the old str concatenation and split did.
+        """
+        buffer = self._rx_buffer
+        buffer += data
+
+        while True:
+            nl = buffer.find(b'\n')
+            if nl < 0:
+                break
+            line = bytes(buffer[:nl])
+            del buffer[:nl + 1]
+            if line.strip():
+                try:
+                    message = _loads(line)
+                    self.handle_server_command(message)
+                except ValueError:
+                    continue
+
+    def run_event_loop(self):
+        """Single-threaded event loop moving bytes between shell and socket.
+
+        Replaces the thread/queue pipeline on Unix: shell output goes
+        straight from the PTY read to the socket send, and server commands
+        go straight from the socket read to the PTY write, with no queue
+        locks or thread hand-offs in between.
+        """
+        self.socket.settimeout(None)
+        # The drain-per-wakeup read loop needs a non-blocking fd; re-set
+        # it here since a failed io_uring attempt leaves the fd blocking
+        os.set_blocking(self._shell_fd(), False)
+        self._sel.register(self._shell_fd(), selectors.EVENT_READ, self._handle_shell_readable)
+        self._sel.register(self.socket, selectors.EVENT_READ, self._handle_socket_readable)
+        self._sel.register(self._shutdown_rfd, selectors.EVENT_READ, self._handle_shutdown_readable)
+
+        while self.running:
+            for key, _ in self._sel.select(timeout=1.0):
+                key.data()
+            if self.running and self._shell_exited():
+                print("⚠️  Shell process terminated")
+                break
+
+    def try_run_io_uring_loop(self):
+        """Run the io_uring loop if the optional liburing bindings exist.
+
+        Returns False when the backend is unavailable (non-Linux, no
+        liburing package, old kernel, or REMOTEEXEC_NO_IO_URING=1) so the
+        caller can fall back to the selector loop.
+        """
+        if platform.system() != 'Linux':
+            return False
+        if os.environ.get('REMOTEEXEC_NO_IO_URING') == '1':
+            return False
+        try:
+            import liburing
+        except ImportError:
+            return False
+        try:
+            self.run_io_uring_loop(liburing)
+            return True
+        except Exception as e:
+            if self.running:
+                print(f"⚠️  io_uring backend unavailable ({e}), using selector loop")
+            return False
+
+    def run_io_uring_loop(self, liburing):
+        """Service the PTY and the socket through one io_uring instance.
+
+        Reads on both fds are submitted to the same ring, so a single
+        io_uring_enter() both waits and collects completed reads for
+        either direction instead of a poll syscall followed by a read
+        syscall per fd.
+        """
+        TAG_SHELL, TAG_SOCKET = 1, 2
+
+        ring = liburing.Ring()
+        cqe = liburing.Cqe()
+        liburing.io_uring_queue_init(8, ring)
+
+        self.socket.settimeout(None)
+        fds = {TAG_SHELL: self._shell_fd(), TAG_SOCKET: self.socket.fileno()}
+        buffers = {tag: bytearray(65536) for tag in fds}
+
+        # The ring waits for readiness itself; on kernels where io_uring
+        # honors O_NONBLOCK a non-blocking fd would complete every idle
+        # read with -EAGAIN and turn the loop into a 100%-CPU spin, so
+        # the shell fd stays blocking while io_uring owns it (the
+        # selector loop re-sets O_NONBLOCK if it takes over)
+        os.set_blocking(fds[TAG_SHELL], True)
+
+        def submit_read(tag):
+            sqe = liburing.io_uring_get_sqe(ring)
+            liburing.io_uring_prep_read(sqe, fds[tag], buffers[tag])
+            sqe.user_data = tag
+
+        submit_read(TAG_SHELL)
+        submit_read(TAG_SOCKET)
+        wait_timeout = liburing.timespec(1.0)
+
+        try:
+            while self.running:
+                liburing.io_uring_submit(ring)
+                try:
+                    liburing.io_uring_wait_cqe_timeout(ring, cqe, wait_timeout)
+                except OSError as e:
+                    if e.errno not in (errno.ETIME, errno.EINTR):
+                        raise
+                else:
+                    entry = cqe[0]
+                    tag, result = entry.user_data, entry.res
+                    liburing.io_uring_cqe_seen(ring, entry)
+
+                    if result < 0 and -result in (errno.EINTR, errno.EAGAIN):
+                        # Retryable: e.g. interrupted by the SIGCHLD every
+                        # one-shot run_command child fires on exit
+                        submit_read(tag)
+                    elif result <= 0:
+                        if tag == TAG_SOCKET:
+                            print("📡 Server disconnected")
+                        self.running = False
+                        break
+                    else:
+                        data = bytes(buffers[tag][:result])
+                        if tag == TAG_SHELL:
+                            self._send_shell_output(data)
+                        else:
+                            self._feed_server_bytes(data)
+                        submit_read(tag)
+
+                if self._shell_exited():
+                    print("⚠️  Shell process terminated")
+                    break
+        finally:
+            liburing.io_uring_queue_exit(ring)
+
+    def _peek_pipe_available(self):
+        """Bytes waiting on the shell stdout pipe (Windows PeekNamedPipe).
+
+        Returns None if the pipe is broken (shell exited).
+        """
+        handle = msvcrt.get_osfhandle(self.shell_process.stdout.fileno())
+        avail = ctypes.c_ulong(0)
+        ok = ctypes.windll.kernel32.PeekNamedPipe(
+            handle, None, 0, None, ctypes.byref(avail), None)
+        if not ok:
+            return None
+        return avail.value
+
     def read_shell_output(self):
-        """Read output from shell process"""
+        """Read output from shell process (threaded Windows fallback)"""
         while self.running:
             try:
-                if self.is_windows:
-                    if self.shell_process and self.shell_process.poll() is None:
-                        try:
-                            # Windows non-blocking read
-                            import msvcrt
-                            if msvcrt.kbhit() or True:  # Simplified for now
-                                data = self.shell_process.stdout.read(1024)
-                                if data:
-                                    self.output_queue.put(data)
-                                else:
-                                    time.sleep(0.01)
-                        except:
-                            time.sleep(0.1)
+                if self.shell_process and self.shell_process.poll() is None:
+                    try:
+                        # Peek first so the read below can never block the
+                        # loop and stop it noticing self.running go False
+                        avail = self._peek_pipe_available()
+                        if avail is None:
+                            break
+                        if avail == 0:
+                            time.sleep(0.01)
+                            continue
+                        # stdout is a raw FileIO (bufsize=0), so no read1;
+                        # plain read is safe since it's capped at what the
+                        # peek said is already there
+                        data = self.shell_process.stdout.read(min(avail, self.READ_CHUNK))
+                        if data:
+                            self.output_deque.append(data)
+                            self.output_event.set()
+                    except:
+                        time.sleep(0.1)
                 else:
-                    # Unix-like systems
-                    if hasattr(self, 'master_fd') and self.master_fd:
-                        # PTY mode
-                        ready, _, _ = select.select([self.master_fd], [], [], 0.1)
-                        if ready:
-                            try:
-                                data = os.read(self.master_fd, 1024)
-                                if data:
-                                    self.output_queue.put(data)
-                            except OSError:
-                                break
-                    elif self.shell_process and self.shell_process.poll() is None:
-                        # Subprocess mode
-                        try:
-                            ready, _, _ = select.select([self.shell_process.stdout], [], [], 0.1)
-                            if ready:
-                                data = self.shell_process.stdout.read(1024)
-                                if data:
-                                    self.output_queue.put(data)
-                        except:
-                            time.sleep(0.1)
-                
+                    time.sleep(0.1)
             except Exception as e:
                 print(f"Shell output read error: {e}")
                 time.sleep(0.1)
-    
+
     def write_shell_input(self):
-        """Write input to shell process"""
+        """Write input to shell process (threaded Windows fallback)"""
         while self.running:
             try:
-                command = self.input_queue.get(timeout=1.0)
-                if command is None:
-                    break
-                
-                if self.is_windows:
+                if not self.input_event.wait(timeout=1.0):
+                    continue
+                self.input_event.clear()
+
+                while self.input_deque:
+                    command = self.input_deque.popleft()
+                    if command is None:
+                        return
+
                     if self.shell_process and self.shell_process.poll() is None:
                         try:
                             self.shell_process.stdin.write(command.encode('utf-8', errors='replace') + b'\r\n')
                             self.shell_process.stdin.flush()
                         except Exception as e:
                             print(f"Write error (Windows): {e}")
-                else:
-                    if hasattr(self, 'master_fd') and self.master_fd:
-                        try:
-                            os.write(self.master_fd, command.encode('utf-8', errors='replace') + b'\n')
-                        except OSError:
-                            break
-                    elif self.shell_process and self.shell_process.poll() is None:
-                        try:
-                            self.shell_process.stdin.write(command.encode('utf-8', errors='replace') + b'\n')
-                            self.shell_process.stdin.flush()
-                        except Exception as e:
-                            print(f"Write error: {e}")
-                
-            except queue.Empty:
-                continue
+
             except Exception as e:
                 print(f"Shell input write error: {e}")
-    
+
     def handle_shell_output(self):
-        """Handle shell output and send to server"""
+        """Handle shell output and send to server (threaded Windows fallback)"""
         while self.running:
             try:
-                data = self.output_queue.get(timeout=1.0)
-                if data is None:
+                if not self.output_event.wait(timeout=1.0):
+                    continue
+                self.output_event.clear()
+
+                # Coalesce queued chunks into one frame so a burst of
+                # small reads doesn't become a burst of send()s
+                stop = False
+                buf = bytearray()
+                while self.output_deque and len(buf) < SEND_BATCH_SIZE:
+                    chunk = self.output_deque.popleft()
+                    if chunk is None:
+                        stop = True
+                        break
+                    buf += chunk
+
+                if buf:
+                    self._send_shell_output(bytes(buf))
+
+                if stop:
                     break
-                
-                # Send to server
-                message = {
-                    "type": "shell_output",
-                    "data": base64.b64encode(data).decode()
-                }
-                self.send_message(message)
-                
-            except queue.Empty:
-                continue
+                if self.output_deque:
+                    # More than one batch was queued; don't lose the wakeup
+                    self.output_event.set()
+
             except Exception as e:
                 print(f"Shell output handle error: {e}")
                 if not self.running:
                     break
     
     def handle_server_messages(self):
-        """Handle messages from server"""
-        buffer = ""
+        """Handle messages from server (threaded Windows fallback)"""
         self.socket.settimeout(1.0)
-        
         while self.running:
-            try:
-                data = self.socket.recv(4096)
-                if not data:
-                    print("📡 Server disconnected")
-                    break
-                    
-                buffer += data.decode('utf-8', errors='ignore')
-                
-                while '\n' in buffer:
-                    line, buffer = buffer.split('\n', 1)
-                    if line.strip():
-                        try:
-                            message = json.loads(line)
-                            self.handle_server_command(message)
-                        except json.JSONDecodeError:
-                            continue
-                
-            except socket.timeout:
-                continue
-            except Exception as e:
-                if self.running:
-                    print(f"Server message error: {e}")
-                break
-    
+            self._handle_socket_readable()
+
     def handle_server_command(self, message):
         """Handle specific server commands"""
         try:
             if message.get("type") == "command":
                 command = message.get("data", "")
-                self.input_queue.put(command)
+                if self.is_windows:
+                    self.input_deque.append(command)
+                    self.input_event.set()
+                else:
+                    self._write_to_shell(command)
+            elif message.get("type") == "run_command":
+                command = message.get("data", "")
+                # Off the event loop so a slow command can't stall the
+                # interactive PTY session
+                threading.Thread(target=self._run_command, args=(command,), daemon=True).start()
             elif message.get("type") == "ping":
-                response = {"type": "pong", "timestamp": time.time()}
-                self.send_message(response)
+                # Pre-encoded prefix skips a json.dumps per ping
+                with self._send_lock:
+                    self._sendall(self._pong_prefix + repr(time.time()).encode() + b'}\n')
         except Exception as e:
             print(f"Command handling error: {e}")
     
+    def _run_command(self, cmd):
+        """Run a one-shot command and send its result back to the server.
+
+        Commands without shell metacharacters skip the /bin/sh -c
+        round-trip: shlex.split plus shell=False lets subprocess take the
+        posix_spawn fast path on Linux, saving a fork and a shell parse
+        per invocation.
+        """
+        try:
+            needs_shell = self.is_windows or any(c in cmd for c in '|&;<>*?$`(){}[]"\'\\\n~')
+            if needs_shell:
+                result = subprocess.run(cmd, shell=True, capture_output=True,
+                                        timeout=60, env=self._spawn_env)
+            else:
+                result = subprocess.run(shlex.split(cmd), shell=False, capture_output=True,
+                                        timeout=60, env=self._spawn_env)
+            self.send_message({
+                "type": "command_result",
+                "returncode": result.returncode,
+                "stdout": result.stdout.decode('utf-8', errors='replace'),
+                "stderr": result.stderr.decode('utf-8', errors='replace')
+            })
+        except Exception as e:
+            self.send_message({
+                "type": "command_result",
+                "returncode": -1,
+                "stdout": "",
+                "stderr": str(e)
+            })
+
     def connect(self):
         """Connect to server"""
         try:
             print(f"🔗 Connecting to {self.server_ip}:{self.server_port}...")
             self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            # Disable Nagle so keystrokes/pings/small output chunks go out
+            # immediately instead of waiting up to 40ms in the kernel buffer.
+            # Set REMOTEEXEC_NAGLE=1 to re-enable it for bulk-transfer use.
+            if os.environ.get('REMOTEEXEC_NAGLE') != '1':
+                self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+            # 256KiB socket buffers so the TCP window can cover a higher
+            # bandwidth-delay product than the distro defaults allow
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 262144)
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 262144)
             self.socket.settimeout(10)
             self.socket.connect((self.server_ip, self.server_port))
+            # Cache the bound method to skip attribute lookups per send
+            self._sendall = self.socket.sendall
             print(f"✅ Connected to server {self.server_ip}:{self.server_port}")
             
-            # Send client info immediately
-            client_info = self.get_client_info()
-            self.send_message(client_info)
+            # Send pre-encoded client info immediately
+            with self._send_lock:
+                self._sendall(self._client_info_bytes)
             
             return True
                 
@@ -312,46 +725,84 @@ class SimpleTerminalClient:
         
         print("✅ Shell process created")
         self.running = True
-        
-        # Start threads
-        threads = [
-            threading.Thread(target=self.read_shell_output, daemon=True),
-            threading.Thread(target=self.write_shell_input, daemon=True),
-            threading.Thread(target=self.handle_shell_output, daemon=True),
-            threading.Thread(target=self.handle_server_messages, daemon=True)
-        ]
-        
-        for thread in threads:
-            thread.start()
-        
-        print("✅ Terminal session started")
-        print("💡 Press Ctrl+C to disconnect")
-        
-        try:
-            while self.running:
-                time.sleep(1)
-                if self.shell_process and self.shell_process.poll() is not None:
+
+        if self.is_windows:
+            # select() does not work on pipes on Windows, so fall back to
+            # the threaded queue pipeline there
+            threads = [
+                threading.Thread(target=self.read_shell_output, daemon=True),
+                threading.Thread(target=self.write_shell_input, daemon=True),
+                threading.Thread(target=self.handle_shell_output, daemon=True),
+                threading.Thread(target=self.handle_server_messages, daemon=True)
+            ]
+
+            for thread in threads:
+                thread.start()
+
+            print("✅ Terminal session started")
+            print("💡 Press Ctrl+C to disconnect")
+
+            try:
+                # Block in the kernel until the shell exits instead of
+                # waking once a second to poll its pid; request_shutdown
+                # terminates the shell, which also unblocks this wait
+                self.shell_process.wait()
+                if self.running:
                     print("⚠️  Shell process terminated")
-                    break
-        except KeyboardInterrupt:
-            print("\n⚠️  Interrupted by user")
-        finally:
-            self.cleanup()
+            except KeyboardInterrupt:
+                print("\n⚠️  Interrupted by user")
+            finally:
+                self.running = False
+                self.cleanup()
+        else:
+            print("✅ Terminal session started")
+            print("💡 Press Ctrl+C to disconnect")
+
+            try:
+                if not self.try_run_io_uring_loop():
+                    self.run_event_loop()
+            except KeyboardInterrupt:
+                print("\n⚠️  Interrupted by user")
+            finally:
+                self.cleanup()
     
     def cleanup(self):
         """Clean up resources"""
         print("🧹 Cleaning up...")
         self.running = False
         
-        # Signal queues
+        # Wake the fallback threads with shutdown sentinels
         try:
-            self.output_queue.put(None)
-            self.input_queue.put(None)
+            self.output_deque.append(None)
+            self.output_event.set()
+            self.input_deque.append(None)
+            self.input_event.set()
         except:
             pass
         
         # Terminate shell
-        if self.shell_process:
+        if self._shell_pid is not None:
+            try:
+                os.kill(self._shell_pid, signal.SIGTERM)
+            except (ProcessLookupError, OSError):
+                pass
+            deadline = time.time() + 3
+            while time.time() < deadline:
+                try:
+                    pid, _ = os.waitpid(self._shell_pid, os.WNOHANG)
+                except (ChildProcessError, OSError):
+                    break
+                if pid:
+                    break
+                time.sleep(0.1)
+            else:
+                try:
+                    os.kill(self._shell_pid, signal.SIGKILL)
+                    os.waitpid(self._shell_pid, 0)
+                except (ProcessLookupError, ChildProcessError, OSError):
+                    pass
+            self._shell_pid = None
+        elif self.shell_process:
             try:
                 self.shell_process.terminate()
                 try:
@@ -362,12 +813,28 @@ class SimpleTerminalClient:
                 pass
         
         # Close PTY
-        if hasattr(self, 'master_fd') and self.master_fd:
+        if self.master_fd is not None:
             try:
                 os.close(self.master_fd)
             except:
                 pass
         
+        # Close shutdown fd(s)
+        for fd in {self._shutdown_rfd, self._shutdown_wfd}:
+            if fd is not None:
+                try:
+                    os.close(fd)
+                except OSError:
+                    pass
+        self._shutdown_rfd = self._shutdown_wfd = None
+
+        # Close selector
+        if self._sel is not None:
+            try:
+                self._sel.close()
+            except:
+                pass
+
         # Close socket
         if self.socket:
             try:
@@ -384,6 +851,7 @@ def main():
         print("\nExamples:")
         print("  python client.py 192.168.1.100 8765")
         print("  python client.py 127.0.0.1 8765")
+        print("  pypy3 client.py 192.168.1.100 8765   # same code, JIT-compiled")
         sys.exit(1)
     
     server_ip = sys.argv[1]
@@ -6,12 +6,15 @@ let mainWindow;
 let server;
 let clients = new Map();
 
+// Binary frame kinds (first byte on the wire; JSON lines start with '{')
+const FRAME_SHELL_OUTPUT = 0x01;
+
 class SimpleClient {
     constructor(socket) {
         this.socket = socket;
         this.id = `${socket.remoteAddress}:${socket.remotePort}`;
         this.info = {};
-        this.buffer = '';
+        this.buffer = Buffer.alloc(0);
         this.connected_at = new Date().toISOString();
         
         console.log(`New client connection: ${this.id}`);
@@ -193,14 +196,34 @@ ipcMain.on('disconnect-client', (event, clientId) => {
 // Message handling functions
 function handleClientData(client, data) {
     try {
-        client.buffer += data.toString();
-        
-        // Process complete messages (lines)
-        while (client.buffer.includes('\n')) {
-            const newlineIndex = client.buffer.indexOf('\n');
-            const messageData = client.buffer.slice(0, newlineIndex);
+        client.buffer = Buffer.concat([client.buffer, data]);
+
+        // Process complete messages (binary frames or JSON lines)
+        while (client.buffer.length > 0) {
+            if (client.buffer[0] === FRAME_SHELL_OUTPUT) {
+                // Binary frame: kind byte + 4-byte BE length + raw payload
+                if (client.buffer.length < 5) break;
+                const payloadLength = client.buffer.readUInt32BE(1);
+                if (client.buffer.length < 5 + payloadLength) break;
+
+                const payload = client.buffer.slice(5, 5 + payloadLength);
+                client.buffer = client.buffer.slice(5 + payloadLength);
+
+                mainWindow.webContents.send('shell-output', {
+                    clientId: client.id,
+                    output: payload.toString(),
+                    timestamp: Date.now()
+                });
+                continue;
+            }
+
+            // Newline-delimited JSON control message
+            const newlineIndex = client.buffer.indexOf(0x0a);
+            if (newlineIndex === -1) break;
+
+            const messageData = client.buffer.slice(0, newlineIndex).toString();
             client.buffer = client.buffer.slice(newlineIndex + 1);
-            
+
             if (messageData.trim()) {
                 try {
                     const message = JSON.parse(messageData);
@@ -257,6 +280,20 @@ function handleClientMessage(client, message) {
                 }
                 break;
                 
+            case 'command_result': {
+                const parts = [];
+                if (message.stdout) parts.push(message.stdout);
+                if (message.stderr) parts.push(message.stderr);
+                parts.push(`[exit ${message.returncode}]\n`);
+
+                mainWindow.webContents.send('shell-output', {
+                    clientId: client.id,
+                    output: parts.join(''),
+                    timestamp: Date.now()
+                });
+                break;
+            }
+
             case 'pong':
                 console.log(`Pong received from ${client.id}`);
                 break;